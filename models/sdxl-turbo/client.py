@@ -6,6 +6,8 @@ import io
 import proto.sdxl_turbo_pb2 as pb2
 import proto.sdxl_turbo_pb2_grpc as pb2_grpc
 
+MAX_MESSAGE_LENGTH = 64 << 20  # 64 MiB, above gRPC's 4 MiB default
+
 def image_to_bytes(image_path: str) -> bytes:
     """Convert image file to bytes."""
     with open(image_path, 'rb') as f:
@@ -16,7 +18,7 @@ def bytes_to_image(image_bytes: bytes, output_path: str):
     with open(output_path, 'wb') as f:
         f.write(image_bytes)
 
-def run_single_image(client, image_path: str, prompt: str, output_path: str):
+def run_single_image(client, image_path: str, prompt: str, output_path: str, output_format: int):
     """Generate a single image."""
     # Convert image to bytes
     image_bytes = image_to_bytes(image_path)
@@ -28,7 +30,8 @@ def run_single_image(client, image_path: str, prompt: str, output_path: str):
         num_inference_steps=2,
         strength=0.8,
         guidance_scale=0.0,
-        seed=0  # Set a default seed value
+        seed=0,  # Set a default seed value
+        output_format=output_format
     )
     
     # Send request
@@ -40,7 +43,7 @@ def run_single_image(client, image_path: str, prompt: str, output_path: str):
     print(f"Request ID: {response.request_id}")
     print(f"Processing time: {response.processing_time_ms}ms")
 
-def run_batch(client, image_path: str, prompt: str, num_images: int, output_prefix: str):
+def run_batch(client, image_path: str, prompt: str, num_images: int, output_prefix: str, output_format: int):
     """Generate multiple images."""
     # Convert image to bytes
     image_bytes = image_to_bytes(image_path)
@@ -52,20 +55,18 @@ def run_batch(client, image_path: str, prompt: str, num_images: int, output_pref
         num_images=num_images,
         num_inference_steps=2,
         strength=0.8,
-        guidance_scale=0.0
+        guidance_scale=0.0,
+        output_format=output_format
     )
     
-    # Send request
-    response = client.Img2ImgBatch(request)
-    
-    # Save results
-    for i, image_bytes in enumerate(response.generated_images):
-        output_path = f"{output_prefix}_{i}.png"
-        bytes_to_image(image_bytes, output_path)
-        print(f"Image {i} saved to {output_path}")
+    # Send request and save results as they stream in
+    extension = pb2.ImageFormat.Name(output_format).lower()
+    for i, response in enumerate(client.Img2ImgBatch(request)):
+        output_path = f"{output_prefix}_{i}.{extension}"
+        bytes_to_image(response.generated_image, output_path)
+        print(f"Image {i} saved to {output_path} ({response.processing_time_ms}ms)")
     
     print(f"Request ID: {response.request_id}")
-    print(f"Processing time: {response.processing_time_ms}ms")
 
 def check_queue_status(client):
     """Check current queue status."""
@@ -83,23 +84,29 @@ def main():
     parser.add_argument("--prompt", help="Generation prompt")
     parser.add_argument("--output", help="Output path (for single mode) or prefix (for batch mode)")
     parser.add_argument("--num-images", type=int, help="Number of images to generate (batch mode)")
+    parser.add_argument("--format", choices=["jpeg", "webp"], default="jpeg",
+                      help="Encoding of the generated images")
     
     args = parser.parse_args()
     
     # Create channel and client
-    channel = grpc.insecure_channel('localhost:50051')
+    channel = grpc.insecure_channel('localhost:50051', options=[
+        ('grpc.max_send_message_length', MAX_MESSAGE_LENGTH),
+        ('grpc.max_receive_message_length', MAX_MESSAGE_LENGTH),
+    ])
     client = pb2_grpc.SDXLTurboServiceStub(channel)
+    output_format = pb2.ImageFormat.Value(args.format.upper())
     
     if args.mode == "status":
         check_queue_status(client)
     elif args.mode == "single":
         if not all([args.image, args.prompt, args.output]):
             parser.error("--image, --prompt, and --output are required for single mode")
-        run_single_image(client, args.image, args.prompt, args.output)
+        run_single_image(client, args.image, args.prompt, args.output, output_format)
     elif args.mode == "batch":
         if not all([args.image, args.prompt, args.output, args.num_images]):
             parser.error("--image, --prompt, --output, and --num-images are required for batch mode")
-        run_batch(client, args.image, args.prompt, args.num_images, args.output)
+        run_batch(client, args.image, args.prompt, args.num_images, args.output, output_format)
 
 if __name__ == '__main__':
     main() 
\ No newline at end of file
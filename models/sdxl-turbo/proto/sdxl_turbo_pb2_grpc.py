@@ -40,10 +40,10 @@ class SDXLTurboServiceStub(object):
                 request_serializer=proto_dot_sdxl__turbo__pb2.Img2ImgRequest.SerializeToString,
                 response_deserializer=proto_dot_sdxl__turbo__pb2.Img2ImgResponse.FromString,
                 _registered_method=True)
-        self.Img2ImgBatch = channel.unary_unary(
+        self.Img2ImgBatch = channel.unary_stream(
                 '/sdxl_turbo.SDXLTurboService/Img2ImgBatch',
                 request_serializer=proto_dot_sdxl__turbo__pb2.Img2ImgBatchRequest.SerializeToString,
-                response_deserializer=proto_dot_sdxl__turbo__pb2.Img2ImgBatchResponse.FromString,
+                response_deserializer=proto_dot_sdxl__turbo__pb2.Img2ImgResponse.FromString,
                 _registered_method=True)
         self.GetQueueStatus = channel.unary_unary(
                 '/sdxl_turbo.SDXLTurboService/GetQueueStatus',
@@ -64,7 +64,7 @@ class SDXLTurboServiceServicer(object):
         raise NotImplementedError('Method not implemented!')
 
     def Img2ImgBatch(self, request, context):
-        """Batch image generation
+        """Batch image generation, streaming each image as soon as it is encoded
         """
         context.set_code(grpc.StatusCode.UNIMPLEMENTED)
         context.set_details('Method not implemented!')
@@ -85,10 +85,10 @@ def add_SDXLTurboServiceServicer_to_server(servicer, server):
                     request_deserializer=proto_dot_sdxl__turbo__pb2.Img2ImgRequest.FromString,
                     response_serializer=proto_dot_sdxl__turbo__pb2.Img2ImgResponse.SerializeToString,
             ),
-            'Img2ImgBatch': grpc.unary_unary_rpc_method_handler(
+            'Img2ImgBatch': grpc.unary_stream_rpc_method_handler(
                     servicer.Img2ImgBatch,
                     request_deserializer=proto_dot_sdxl__turbo__pb2.Img2ImgBatchRequest.FromString,
-                    response_serializer=proto_dot_sdxl__turbo__pb2.Img2ImgBatchResponse.SerializeToString,
+                    response_serializer=proto_dot_sdxl__turbo__pb2.Img2ImgResponse.SerializeToString,
             ),
             'GetQueueStatus': grpc.unary_unary_rpc_method_handler(
                     servicer.GetQueueStatus,
@@ -145,12 +145,12 @@ class SDXLTurboService(object):
             wait_for_ready=None,
             timeout=None,
             metadata=None):
-        return grpc.experimental.unary_unary(
+        return grpc.experimental.unary_stream(
             request,
             target,
             '/sdxl_turbo.SDXLTurboService/Img2ImgBatch',
             proto_dot_sdxl__turbo__pb2.Img2ImgBatchRequest.SerializeToString,
-            proto_dot_sdxl__turbo__pb2.Img2ImgBatchResponse.FromString,
+            proto_dot_sdxl__turbo__pb2.Img2ImgResponse.FromString,
             options,
             channel_credentials,
             insecure,
@@ -1,9 +1,12 @@
 import asyncio
+import itertools
 import logging
+import math
+import os
 import time
 import uuid
 from concurrent.futures import ThreadPoolExecutor
-from typing import List
+from typing import AsyncIterator, List
 
 import grpc
 from grpc import aio
@@ -12,60 +15,92 @@ from model import SDXLTurboModel
 import proto.sdxl_turbo_pb2 as pb2
 import proto.sdxl_turbo_pb2_grpc as pb2_grpc
 
+MAX_MESSAGE_LENGTH = 64 << 20  # 64 MiB, above gRPC's 4 MiB default
+# Comma-separated batch sizes compiled on top of the model's defaults, e.g. the
+# num_images clients send to Img2ImgBatch, so those batches are not padded
+BATCH_SIZES_ENV = "SDXL_BATCH_SIZES"
+
 class RequestQueue:
-    def __init__(self):
+    def __init__(self, max_batch_size: int = 1):
         self.queue = asyncio.Queue()
+        self.max_batch_size = max_batch_size
         self.active_requests = 0
         self.avg_processing_time = 0
-        self.total_processed = 0
+        self._len = 0  # Tracked here so status polls never introspect the queue
 
     async def add_request(self, request_id: str, request_data: dict):
+        self._len += 1
         await self.queue.put((request_id, request_data))
 
     async def get_request(self):
-        return await self.queue.get()
+        item = await self.queue.get()
+        self._len -= 1
+        return item
 
     def update_processing_time(self, processing_time_ms: int):
-        self.total_processed += 1
-        self.avg_processing_time = (
-            (self.avg_processing_time * (self.total_processed - 1) + processing_time_ms)
-            / self.total_processed
-        )
+        # Exponential moving average of one batch's pipeline call, seeded with the first sample
+        if not self.avg_processing_time:
+            self.avg_processing_time = processing_time_ms
+        else:
+            self.avg_processing_time = 0.9 * self.avg_processing_time + 0.1 * processing_time_ms
 
     def get_status(self):
         return {
-            "queue_length": self.queue.qsize(),
+            "queue_length": self._len,
             "active_requests": self.active_requests,
-            "estimated_wait_time_ms": self.avg_processing_time * self.queue.qsize()
+            # Queued requests run up to max_batch_size per pipeline call
+            "estimated_wait_time_ms": int(
+                self.avg_processing_time * math.ceil(self._len / self.max_batch_size)
+            )
         }
 
 class SDXLTurboServicer(pb2_grpc.SDXLTurboServiceServicer):
-    def __init__(self):
+    def __init__(self,
+                 max_batch_size: int = 4,
+                 max_batch_delay_ms: int = 30,
+                 batch_sizes: tuple = ()):
         self.logger = logging.getLogger(__name__)
-        self.model = SDXLTurboModel()
-        self.request_queue = RequestQueue()
-        self.executor = ThreadPoolExecutor(max_workers=1)  # Single worker for MPS
-        self.request_counter = 0  # Add a counter for request IDs
+        self.model = SDXLTurboModel(max_batch_size=max_batch_size, batch_sizes=batch_sizes)
+        self.request_queue = RequestQueue(max_batch_size)
+        self.cpu_exec = ThreadPoolExecutor(max_workers=os.cpu_count())  # Decode, resize, encode
+        self.gpu_exec = ThreadPoolExecutor(max_workers=1)  # Single worker for MPS / CUDA graph reuse
+        # Capture CUDA graphs on the worker thread that will replay them
+        self.gpu_exec.submit(self.model._warmup).result()
+        self._id_gen = itertools.count()  # Request IDs
+        self.max_batch_size = max_batch_size
+        self.max_batch_delay_ms = max_batch_delay_ms
+        self._dispatcher = asyncio.create_task(self._dispatch())
         self.logger.info("SDXL-Turbo servicer initialized")
 
     async def Img2Img(self, request: pb2.Img2ImgRequest, context) -> pb2.Img2ImgResponse:
         """Handle single image generation request."""
-        request_id = self.request_counter
-        self.request_counter += 1
+        request_id = next(self._id_gen)
         self.logger.info(f"Received Img2Img request {request_id}")
         
-        # Process the request
+        # Preprocess on the CPU pool, then queue the request for the dispatcher,
+        # which may batch it with others on the GPU worker
         try:
             start_time = time.time()
-            generated_image = await asyncio.get_event_loop().run_in_executor(
-                self.executor,
-                self.model.generate_image,
-                request.image,
-                request.prompt,
-                request.num_inference_steps,
-                request.strength,
-                request.guidance_scale,
-                request.seed
+            loop = asyncio.get_running_loop()
+            init_image = await loop.run_in_executor(
+                self.cpu_exec, self.model._preprocess, request.image
+            )
+            future = loop.create_future()
+            await self.request_queue.add_request(request_id, {
+                "image": init_image,
+                "prompt": request.prompt,
+                "num_inference_steps": request.num_inference_steps,
+                "strength": request.strength,
+                "guidance_scale": request.guidance_scale,
+                "seed": request.seed,
+                "future": future
+            })
+            result = await future
+            generated_image = await loop.run_in_executor(
+                self.cpu_exec,
+                self.model._postprocess,
+                result,
+                pb2.ImageFormat.Name(request.output_format)
             )
             
             return pb2.Img2ImgResponse(
@@ -77,32 +112,109 @@ class SDXLTurboServicer(pb2_grpc.SDXLTurboServiceServicer):
             self.logger.error(f"Error processing request {request_id}: {str(e)}")
             raise
 
-    async def Img2ImgBatch(self, request: pb2.Img2ImgBatchRequest, context) -> pb2.Img2ImgBatchResponse:
-        """Handle batch image generation request."""
-        request_id = self.request_counter
-        self.request_counter += 1
+    async def _dispatch(self):
+        """Form batches of queued Img2Img requests and run each as one pipeline call.
+        
+        Waits for a request, then collects up to max_batch_size - 1 more for at
+        most max_batch_delay_ms before running the batch.
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.request_queue.get_request()]
+            deadline = loop.time() + self.max_batch_delay_ms / 1000
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.request_queue.get_request(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            await self._run_batch(batch)
+
+    async def _run_batch(self, batch: List[tuple]):
+        """Run a batch of preprocessed Img2Img requests and resolve their futures."""
+        # Only requests with the same generation parameters can share a pipeline call
+        groups = {}
+        for request_id, data in batch:
+            key = (
+                data["num_inference_steps"],
+                data["strength"],
+                data["guidance_scale"]
+            )
+            groups.setdefault(key, []).append(data)
+        
+        loop = asyncio.get_running_loop()
+        for (num_inference_steps, strength, guidance_scale), items in groups.items():
+            self.logger.info(f"Running Img2Img batch of {len(items)}")
+            self.request_queue.active_requests += len(items)
+            start_time = time.time()
+            try:
+                results = await loop.run_in_executor(
+                    self.gpu_exec,
+                    self.model._infer,
+                    [data["image"] for data in items],
+                    [data["prompt"] for data in items],
+                    [data["seed"] for data in items],
+                    num_inference_steps,
+                    strength,
+                    guidance_scale
+                )
+            except Exception as e:
+                for data in items:
+                    if not data["future"].done():
+                        data["future"].set_exception(e)
+            else:
+                self.request_queue.update_processing_time(int((time.time() - start_time) * 1000))
+                for data, result in zip(items, results):
+                    if not data["future"].done():
+                        data["future"].set_result(result)
+            finally:
+                self.request_queue.active_requests -= len(items)
+
+    async def Img2ImgBatch(self, request: pb2.Img2ImgBatchRequest, context) -> AsyncIterator[pb2.Img2ImgResponse]:
+        """Handle batch image generation request, streaming each image back as it is ready."""
+        request_id = next(self._id_gen)
         self.logger.info(f"Received Img2ImgBatch request {request_id}")
         
-        # Process the request
+        # Preprocess and encode on the CPU pool, infer on the GPU worker
         try:
             start_time = time.time()
-            generated_images = await asyncio.get_event_loop().run_in_executor(
-                self.executor,
-                self.model.generate_batch,
-                request.image,
-                request.prompt,
-                request.num_images,
+            loop = asyncio.get_running_loop()
+            init_image = await loop.run_in_executor(
+                self.cpu_exec, self.model._preprocess, request.image
+            )
+            results = await loop.run_in_executor(
+                self.gpu_exec,
+                self.model._infer,
+                [init_image],
+                [request.prompt],
+                [request.seed],
                 request.num_inference_steps,
                 request.strength,
                 request.guidance_scale,
-                request.seed
+                request.num_images
             )
             
-            return pb2.Img2ImgBatchResponse(
-                generated_images=generated_images,
-                request_id=request_id,
-                processing_time_ms=int((time.time() - start_time) * 1000)
-            )
+            # Encode all images in parallel, streaming each back in order as it is ready
+            output_format = pb2.ImageFormat.Name(request.output_format)
+            encoded = [
+                loop.run_in_executor(
+                    self.cpu_exec,
+                    self.model._postprocess,
+                    result,
+                    output_format,
+                    request.output_width,
+                    request.output_height
+                )
+                for result in results
+            ]
+            for generated_image in encoded:
+                yield pb2.Img2ImgResponse(
+                    generated_image=await generated_image,
+                    request_id=request_id,
+                    processing_time_ms=int((time.time() - start_time) * 1000)
+                )
         except Exception as e:
             self.logger.error(f"Error processing batch request {request_id}: {str(e)}")
             raise
@@ -115,35 +227,35 @@ class SDXLTurboServicer(pb2_grpc.SDXLTurboServiceServicer):
             active_requests=status["active_requests"]
         )
 
-    def _process_single_request(self, request_id: str):
-        request_data = asyncio.run(self.request_queue.get_request())
-        return self.model.generate_image(
-            image_bytes=request_data[1]["image_bytes"],
-            prompt=request_data[1]["prompt"],
-            num_inference_steps=request_data[1]["num_inference_steps"],
-            strength=request_data[1]["strength"],
-            guidance_scale=request_data[1]["guidance_scale"],
-            seed=request_data[1]["seed"]
-        )
+def _warm_protos():
+    """Round-trip each message type once so descriptor and serializer setup
+    happens at startup rather than on the first RPC."""
+    for message in (
+        pb2.Img2ImgRequest(image=b'x', prompt='x'),
+        pb2.Img2ImgBatchRequest(image=b'x', prompt='x', num_images=1),
+        pb2.Img2ImgResponse(generated_image=b'x', request_id=0, processing_time_ms=0),
+        pb2.QueueStatusRequest(),
+        pb2.QueueStatusResponse(queue_length=0, estimated_wait_time_ms=0, active_requests=0),
+    ):
+        type(message).FromString(message.SerializeToString())
 
-    def _process_batch_request(self, request_id: str):
-        request_data = asyncio.run(self.request_queue.get_request())
-        return self.model.generate_batch(
-            image_bytes=request_data[1]["image_bytes"],
-            prompt=request_data[1]["prompt"],
-            num_images=request_data[1]["num_images"],
-            num_inference_steps=request_data[1]["num_inference_steps"],
-            strength=request_data[1]["strength"],
-            guidance_scale=request_data[1]["guidance_scale"],
-            seed=request_data[1]["seed"]
-        )
+def _batch_sizes_from_env() -> tuple:
+    """Parse the extra compiled batch sizes from BATCH_SIZES_ENV."""
+    value = os.environ.get(BATCH_SIZES_ENV, "")
+    return tuple(int(size) for size in value.split(",") if size.strip())
 
 async def serve():
     logging.basicConfig(level=logging.INFO)
-    server = aio.server()
-    pb2_grpc.add_SDXLTurboServiceServicer_to_server(SDXLTurboServicer(), server)
+    server = aio.server(options=[
+        ('grpc.max_send_message_length', MAX_MESSAGE_LENGTH),
+        ('grpc.max_receive_message_length', MAX_MESSAGE_LENGTH),
+    ])
+    pb2_grpc.add_SDXLTurboServiceServicer_to_server(
+        SDXLTurboServicer(batch_sizes=_batch_sizes_from_env()), server
+    )
     server.add_insecure_port('[::]:50051')
     await server.start()
+    _warm_protos()
     logging.info("Server started on port 50051")
     await server.wait_for_termination()
 
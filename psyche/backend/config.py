@@ -1,16 +1,23 @@
 """Configuration settings and constants for the application."""
 
+import os
+
 # File paths
 TEST_IMAGE_PATH = "../../seed-images/hanbok-red.jpg"
 
 # Server settings
 GRPC_SERVER_ADDRESS = "localhost:50051"
+WEB_CONCURRENCY = int(os.environ.get("WEB_CONCURRENCY", "1"))  # uvicorn worker processes
+REDIS_URL = os.environ.get("REDIS_URL", "redis://localhost:6379/0")  # relays frames when WEB_CONCURRENCY > 1
+GRPC_CHANNEL_POOL_SIZE = 4  # channels (HTTP/2 connections) to the SDXL-Turbo service
+GRPC_MAX_MESSAGE_LENGTH = 64 << 20  # bytes, above gRPC's 4 MiB default
+GRPC_KEEPALIVE_TIME_MS = 20000  # ping during active calls (e.g. long image streams) to detect dead connections
 
 # Default values
 DEFAULT_PROMPT = "trade"
 DEFAULT_FPS = 1.0
 DEFAULT_NUM_IMAGES = 10
-DEFAULT_NUM_GENERATED_IMAGES = 5
+DEFAULT_NUM_GENERATED_IMAGES = 5  # keep in sync with SDXL_BATCH_SIZES of the SDXL-Turbo service
 
 # Timing constants
 CONNECTION_LOG_INTERVAL = 60  # seconds
@@ -18,6 +25,7 @@ IMAGE_SEND_INTERVAL = 1.0  # seconds
 
 # Canvas settings
 CANVAS_SLUGS = ["left-canva", "right-canva"]
+CLIENT_QUEUE_SIZE = 8  # frames buffered per client before new ones are dropped
 
 # Logging configuration
 LOGGING_CONFIG = {
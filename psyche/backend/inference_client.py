@@ -1,17 +1,21 @@
 """SDXL-Turbo inference client for image generation."""
 
+import io
+import itertools
 import logging
 import os
 import sys
-from typing import List
+from typing import AsyncIterator, Optional, Tuple
 
-import grpc
+from grpc import aio
 from PIL import Image
-import io
 import traceback
 
 from config import (
     GRPC_SERVER_ADDRESS,
+    GRPC_CHANNEL_POOL_SIZE,
+    GRPC_MAX_MESSAGE_LENGTH,
+    GRPC_KEEPALIVE_TIME_MS,
     DEFAULT_NUM_GENERATED_IMAGES,
     TEST_IMAGE_PATH
 )
@@ -30,66 +34,142 @@ import proto.sdxl_turbo_pb2_grpc as pb2_grpc
 
 logger = logging.getLogger(__name__)
 
+class ChannelPool:
+    """Round-robin pool of gRPC channels, each with its own stub.
+    
+    Spreading calls over several HTTP/2 connections keeps a large image
+    stream from head-of-line blocking other calls on the same connection.
+    """
+    
+    def __init__(self, address: str, size: int = GRPC_CHANNEL_POOL_SIZE):
+        """Open the channels. Must be called from the event loop that uses them.
+        
+        Args:
+            address: The gRPC server address
+            size: Number of channels in the pool
+        """
+        self._channels = [
+            aio.insecure_channel(
+                address,
+                options=[
+                    ('grpc.use_local_subchannel_pool', 1),
+                    ('grpc.keepalive_time_ms', GRPC_KEEPALIVE_TIME_MS),
+                    ('grpc.max_send_message_length', GRPC_MAX_MESSAGE_LENGTH),
+                    ('grpc.max_receive_message_length', GRPC_MAX_MESSAGE_LENGTH),
+                    # Distinct args so the channels' subchannels are never coalesced
+                    ('grpc.channel_id', i),
+                ]
+            )
+            for i in range(size)
+        ]
+        self._stubs = [pb2_grpc.SDXLTurboServiceStub(channel) for channel in self._channels]
+        self._counter = itertools.count()
+
+    def stub(self) -> pb2_grpc.SDXLTurboServiceStub:
+        """Get the next stub in round-robin order."""
+        return self._stubs[next(self._counter) % len(self._stubs)]
+
+    async def close(self):
+        """Close all channels in the pool."""
+        for channel in self._channels:
+            await channel.close()
+
 class InferenceClient:
     """Client for interacting with the SDXL-Turbo service."""
     
     def __init__(self):
-        """Initialize the inference client."""
-        self.channel = grpc.insecure_channel(GRPC_SERVER_ADDRESS)
-        self.client = pb2_grpc.SDXLTurboServiceStub(self.channel)
+        """Initialize the inference client. Call start() before generating images."""
+        self.pool = None
+        # Seed image as read from disk, its size, and the copy sent to the model;
+        # None until start() has loaded it
+        self.seed_bytes: Optional[bytes] = None
+        self.seed_size: Optional[Tuple[int, int]] = None
+        self._seed_resized_bytes: Optional[bytes] = None
         logger.info("Inference client initialized")
 
-    def generate_images(
+    async def start(self):
+        """Load the seed image and open the gRPC channels on the running event loop."""
+        self._load_seed()
+        self.pool = ChannelPool(GRPC_SERVER_ADDRESS)
+        logger.info("Inference client started")
+
+    def _load_seed(self):
+        """Read the seed image once, and pre-resize it to the size the model expects.
+        
+        A missing or unreadable file is logged and leaves the seed unset, so
+        only image generation is unavailable.
+        """
+        try:
+            with open(TEST_IMAGE_PATH, 'rb') as f:
+                seed_bytes = f.read()
+            seed_image = Image.open(io.BytesIO(seed_bytes))
+            seed_size = seed_image.size
+            buffer = io.BytesIO()
+            seed_image.convert("RGB").resize((512, 512), Image.Resampling.LANCZOS).save(
+                buffer, format="JPEG", quality=95
+            )
+        except OSError as e:
+            logger.error(f"Could not load seed image {TEST_IMAGE_PATH}: {str(e)}")
+            return
+        self.seed_bytes = seed_bytes
+        self.seed_size = seed_size
+        self._seed_resized_bytes = buffer.getvalue()
+
+    async def generate_images(
         self,
         prompt: str,
         num_images: int = DEFAULT_NUM_GENERATED_IMAGES,
         strength: float = 0.8,
-        guidance_scale: float = 0.0
-    ) -> List[Image.Image]:
+        guidance_scale: float = 0.0,
+        output_width: int = 0,
+        output_height: int = 0
+    ) -> AsyncIterator[bytes]:
         """Generate images using SDXL-Turbo.
         
+        Images are streamed back by the service and yielded as they arrive,
+        so the first one can be used while the rest are still being encoded.
+        
         Args:
             prompt: The text prompt for image generation
             num_images: Number of images to generate
             strength: Strength parameter for img2img
             guidance_scale: Guidance scale parameter
+            output_width: Width the service resizes images to (0 keeps the generated size)
+            output_height: Height the service resizes images to (0 keeps the generated size)
+            
+        Yields:
+            bytes: Each generated image, JPEG-encoded
             
-        Returns:
-            List[Image.Image]: List of generated images
+        Raises:
+            RuntimeError: If the seed image could not be loaded
         """
+        if self._seed_resized_bytes is None:
+            raise RuntimeError(f"Seed image {TEST_IMAGE_PATH} is not loaded")
         try:
-            # Read the test image
-            with open(TEST_IMAGE_PATH, 'rb') as f:
-                image_bytes = f.read()
-            
             # Create batch request
             request = Img2ImgBatchRequest(
-                image=image_bytes,
+                image=self._seed_resized_bytes,
                 prompt=prompt,
                 num_images=num_images,
                 num_inference_steps=2,
                 strength=strength,
-                guidance_scale=guidance_scale
+                guidance_scale=guidance_scale,
+                output_width=output_width,
+                output_height=output_height
             )
             
-            # Send request to SDXL-Turbo service
-            response = self.client.Img2ImgBatch(request)
+            # Stream responses from SDXL-Turbo service
+            async for response in self.pool.stub().Img2ImgBatch(request):
+                yield response.generated_image
             logger.info("Images generated successfully")
             
-            # Convert response to PIL Images
-            images = []
-            for image_bytes in response.generated_images:
-                img = Image.open(io.BytesIO(image_bytes))
-                images.append(img)
-            
-            return images
-            
         except Exception as e:
             logger.error(f"Error in image generation: {str(e)}")
             logger.error(f"Stack trace: {traceback.format_exc()}")
             raise
 
-    def close(self):
-        """Close the gRPC channel."""
-        self.channel.close()
+    async def close(self):
+        """Close the gRPC channels."""
+        if self.pool:
+            await self.pool.close()
         logger.info("Inference client closed") 
\ No newline at end of file
@@ -9,7 +9,6 @@ import traceback
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
 import uvicorn
-from PIL import Image
 
 from config import (
     LOGGING_CONFIG,
@@ -18,7 +17,8 @@ from config import (
     DEFAULT_FPS,
     DEFAULT_NUM_IMAGES,
     DEFAULT_NUM_GENERATED_IMAGES,
-    IMAGE_SEND_INTERVAL
+    IMAGE_SEND_INTERVAL,
+    WEB_CONCURRENCY
 )
 from websocket_manager import WebSocketManager
 from image_handler import ImageHandler
@@ -48,13 +48,14 @@ inference_client = InferenceClient()
 async def startup_event():
     """Start the application and initialize managers."""
     await ws_manager.start()
+    await inference_client.start()
     logger.info("Server started successfully")
 
 @app.on_event("shutdown")
 async def shutdown_event():
     """Handle server shutdown."""
     await ws_manager.stop()
-    inference_client.close()
+    await inference_client.close()
     logger.info("Server shutting down")
 
 @app.websocket("/ws/{canvas_slug}")
@@ -68,7 +69,7 @@ async def websocket_endpoint(websocket: WebSocket, canvas_slug: str):
             # Keep connection alive
             await websocket.receive_text()
     except WebSocketDisconnect:
-        logger.info(f"Client disconnected normally from canvas '{canvas_slug}'")
+        logger.info("Client disconnected normally from canvas '%s'", canvas_slug)
     except Exception as e:
         logger.error(f"Connection error for canvas '{canvas_slug}': {str(e)}")
         logger.error(f"Stack trace: {traceback.format_exc()}")
@@ -82,8 +83,7 @@ async def test_stream(
     fps: float = DEFAULT_FPS
 ):
     """Test endpoint that streams a sequence of test images to a specific canvas."""
-    connections = ws_manager.get_connections(canvas_slug)
-    if not connections:
+    if not ws_manager.is_watched(canvas_slug):
         return {"error": f"No active connections for canvas '{canvas_slug}'"}
         
     logger.info(
@@ -96,11 +96,12 @@ async def test_stream(
         try:
             test_image_path = f"test_images/image_{i}.jpg"
             logger.debug(
-                f"Sending image {i+1}/{num_images} to canvas '{canvas_slug}': "
-                f"{test_image_path}"
+                "Sending image %d/%d to canvas '%s': %s",
+                i + 1, num_images, canvas_slug, test_image_path
             )
-            img = Image.open(test_image_path)
-            await ImageHandler.send_image(img, connections, canvas_slug)
+            with open(test_image_path, 'rb') as f:
+                img_bytes = f.read()
+            await ImageHandler.send_raw_bytes(img_bytes, ws_manager, canvas_slug)
             await asyncio.sleep(sleep_time)
         except Exception as e:
             logger.error(
@@ -114,36 +115,38 @@ async def test_stream(
 @app.get("/test-inference")
 async def test_inference(prompt: str = DEFAULT_PROMPT):
     """Test endpoint that generates images using SDXL-Turbo."""
-    left_connections = ws_manager.get_connections("left-canva")
-    right_connections = ws_manager.get_connections("right-canva")
-    
-    if not right_connections:
+    if not ws_manager.is_watched("right-canva"):
         return {"error": "No active connections for right canvas"}
+    if inference_client.seed_bytes is None:
+        return {"error": f"Seed image {TEST_IMAGE_PATH} is not available"}
         
     logger.info(f"Starting inference test with prompt: '{prompt}'")
     
     try:
-        # Send the test image to left-canva
-        test_img = Image.open(TEST_IMAGE_PATH)
-        await ImageHandler.send_image(test_img, left_connections, "left-canva")
+        # Send the test image to left-canva, as loaded by the inference client
+        await ImageHandler.send_raw_bytes(inference_client.seed_bytes, ws_manager, "left-canva")
         logger.info("Sent test image to left-canva")
         
-        # Get test image dimensions for resizing
-        test_width, test_height = test_img.size
-        
-        # Generate images
-        images = inference_client.generate_images(prompt)
+        # Generate images, resized by the service to match test image dimensions
+        test_width, test_height = inference_client.seed_size
+        images = inference_client.generate_images(
+            prompt,
+            output_width=test_width,
+            output_height=test_height
+        )
         
-        # Stream generated images to right-canva
-        for i, img in enumerate(images):
+        # Queue generated images for right-canva as the service streams them back;
+        # each client's writer paces them IMAGE_SEND_INTERVAL apart
+        i = 0
+        async for image_bytes in images:
+            i += 1
             try:
-                # Resize image to match test image dimensions
-                img = ImageHandler.resize_image(img, test_width, test_height)
-                await ImageHandler.send_image(img, right_connections, "right-canva")
-                logger.debug(f"Sent image {i+1}/{DEFAULT_NUM_GENERATED_IMAGES}")
-                await asyncio.sleep(IMAGE_SEND_INTERVAL)
+                await ImageHandler.send_raw_bytes(
+                    image_bytes, ws_manager, "right-canva", interval=IMAGE_SEND_INTERVAL
+                )
+                logger.debug("Queued image %d/%d", i, DEFAULT_NUM_GENERATED_IMAGES)
             except Exception as e:
-                logger.error(f"Error processing image {i+1}: {str(e)}")
+                logger.error(f"Error processing image {i}: {str(e)}")
                 logger.error(f"Stack trace: {traceback.format_exc()}")
                 
     except Exception as e:
@@ -157,4 +160,14 @@ if __name__ == "__main__":
     # Create test_images directory if it doesn't exist
     os.makedirs("test_images", exist_ok=True)
     logger.info("Starting server...")
-    uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True) 
\ No newline at end of file
+    uvicorn.run(
+        "main:app",
+        host="0.0.0.0",
+        port=8000,
+        loop="uvloop",
+        http="httptools",
+        ws="websockets",
+        # Frames are JPEG, which deflate cannot shrink; don't compress per connection
+        ws_per_message_deflate=False,
+        workers=WEB_CONCURRENCY
+    ) 
\ No newline at end of file
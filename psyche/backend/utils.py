@@ -1,12 +1,17 @@
 import os
 import time
+from collections import OrderedDict
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
 
+_IMG_EXTS = frozenset({'.jpg', '.jpeg', '.png', '.gif', '.bmp'})
+_MAX_TRACKED_FILES = 4096
+
 class ImageHandler(FileSystemEventHandler):
     def __init__(self, callback):
         self.callback = callback
-        self.last_modified = {}
+        # Last modification time per path, least recently modified first
+        self.last_modified = OrderedDict()
         
     def on_created(self, event):
         if not event.is_directory and self._is_image_file(event.src_path):
@@ -19,17 +24,20 @@ class ImageHandler(FileSystemEventHandler):
                 # Ensure we don't process the same file multiple times
                 if current_time - self.last_modified[event.src_path] > 0.5:
                     self.callback(event.src_path)
+                self.last_modified.move_to_end(event.src_path)
             else:
                 self.callback(event.src_path)
+                if len(self.last_modified) >= _MAX_TRACKED_FILES:
+                    self.last_modified.popitem(last=False)
             self.last_modified[event.src_path] = current_time
             
     def _is_image_file(self, path):
         ext = os.path.splitext(path)[1].lower()
-        return ext in ['.jpg', '.jpeg', '.png', '.gif', '.bmp']
+        return ext in _IMG_EXTS
 
 def monitor_directory(directory_path, callback):
     event_handler = ImageHandler(callback)
     observer = Observer()
     observer.schedule(event_handler, directory_path, recursive=True)
     observer.start()
-    return observer 
\ No newline at end of file
+    return observer 
@@ -2,40 +2,81 @@
 
 import asyncio
 import logging
+import struct
 import uuid
-from typing import Dict, Set
+from typing import Callable, Dict, Tuple
 
+import redis.asyncio as redis
 from fastapi import WebSocket, WebSocketDisconnect
 
-from config import CONNECTION_LOG_INTERVAL, CANVAS_SLUGS
+from config import (
+    CONNECTION_LOG_INTERVAL,
+    CANVAS_SLUGS,
+    CLIENT_QUEUE_SIZE,
+    WEB_CONCURRENCY,
+    REDIS_URL
+)
 
 logger = logging.getLogger(__name__)
 
+REDIS_CHANNEL_PREFIX = "canvas:"
+RELAY_HEADER = struct.Struct(">d")  # pacing interval prepended to relayed frames
+RELAY_RETRY_DELAY = 1.0  # seconds before resubscribing after a Redis error
+
 class WebSocketManager:
-    """Manages WebSocket connections for different canvases."""
+    """Manages WebSocket connections for different canvases.
+    
+    With more than one worker process, frames are published to Redis and
+    every worker fans them out to the clients it holds.
+    """
     
     def __init__(self):
         """Initialize the WebSocket manager."""
-        self.connections: Dict[str, Set[WebSocket]] = {
-            slug: set() for slug in CANVAS_SLUGS
+        # Immutable snapshots, replaced on connect/disconnect, so they can be
+        # iterated (even across awaits) without copying
+        self.connections: Dict[str, Tuple[WebSocket, ...]] = {
+            slug: () for slug in CANVAS_SLUGS
+        }
+        # Each client's bound queue.put_nowait, parallel to connections, so
+        # fan-out is a plain loop over callables
+        self._puts: Dict[str, Tuple[Callable, ...]] = {
+            slug: () for slug in CANVAS_SLUGS
         }
+        self._writers: Dict[WebSocket, asyncio.Task] = {}
         self._log_task = None
+        self._redis = None
+        self._relay_task = None
 
     async def start(self):
-        """Start the connection logging task."""
+        """Start the connection logging task, and the Redis relay when running multiple workers."""
         self._log_task = asyncio.create_task(self._log_connections())
+        if WEB_CONCURRENCY > 1:
+            self._redis = redis.from_url(REDIS_URL)
+            self._relay_task = asyncio.create_task(self._relay(await self._subscribe()))
         logger.info("WebSocket manager started")
 
     async def stop(self):
         """Stop the connection logging task and close all connections."""
         if self._log_task:
             self._log_task.cancel()
-        for canvas_slug, connections in self.connections.items():
-            for connection in connections:
-                try:
-                    await connection.close()
-                except Exception as e:
-                    logger.error(f"Error closing connection for canvas {canvas_slug}: {str(e)}")
+        if self._relay_task:
+            self._relay_task.cancel()
+        if self._redis:
+            await self._redis.aclose()
+        for writer in self._writers.values():
+            writer.cancel()
+        # Close every client concurrently, so one slow close doesn't hold up the rest
+        closing = [
+            (canvas_slug, connection)
+            for canvas_slug, connections in self.connections.items()
+            for connection in connections
+        ]
+        results = await asyncio.gather(
+            *(connection.close() for _, connection in closing), return_exceptions=True
+        )
+        for (canvas_slug, _), result in zip(closing, results):
+            if isinstance(result, Exception):
+                logger.error(f"Error closing connection for canvas {canvas_slug}: {str(result)}")
         logger.info("WebSocket manager stopped")
 
     async def _log_connections(self):
@@ -43,7 +84,7 @@ class WebSocketManager:
         while True:
             for canvas_slug, connections in self.connections.items():
                 logger.info(
-                    f"Canvas '{canvas_slug}' has {len(connections)} active connections"
+                    "Canvas '%s' has %d active connections", canvas_slug, len(connections)
                 )
             await asyncio.sleep(CONNECTION_LOG_INTERVAL)
 
@@ -63,10 +104,15 @@ class WebSocketManager:
 
         client_id = str(uuid.uuid4())[:8]
         await websocket.accept()
-        self.connections[canvas_slug].add(websocket)
+        queue = asyncio.Queue(maxsize=CLIENT_QUEUE_SIZE)
+        self.connections[canvas_slug] += (websocket,)
+        self._puts[canvas_slug] += (queue.put_nowait,)
+        self._writers[websocket] = asyncio.create_task(
+            self._writer(websocket, canvas_slug, queue)
+        )
         logger.info(
-            f"New connection established for canvas '{canvas_slug}' "
-            f"(Client ID: {client_id}). Total connections: {len(self.connections[canvas_slug])}"
+            "New connection established for canvas '%s' (Client ID: %s). Total connections: %d",
+            canvas_slug, client_id, len(self.connections[canvas_slug])
         )
         return True
 
@@ -77,20 +123,150 @@ class WebSocketManager:
             websocket: The WebSocket connection
             canvas_slug: The canvas to disconnect from
         """
+        writer = self._writers.pop(websocket, None)
+        if writer is not None and writer is not asyncio.current_task():
+            writer.cancel()
         if websocket in self.connections[canvas_slug]:
-            self.connections[canvas_slug].remove(websocket)
+            remaining = [
+                (connection, put)
+                for connection, put in zip(self.connections[canvas_slug], self._puts[canvas_slug])
+                if connection is not websocket
+            ]
+            self.connections[canvas_slug] = tuple(connection for connection, _ in remaining)
+            self._puts[canvas_slug] = tuple(put for _, put in remaining)
             logger.info(
-                f"Connection closed for canvas '{canvas_slug}'. "
-                f"Remaining connections: {len(self.connections[canvas_slug])}"
+                "Connection closed for canvas '%s'. Remaining connections: %d",
+                canvas_slug, len(self.connections[canvas_slug])
+            )
+
+    async def _writer(self, websocket: WebSocket, canvas_slug: str, queue: asyncio.Queue):
+        """Send queued frames to one client, so a slow client only delays itself.
+        
+        Each frame is followed by its pacing interval before the next is sent.
+        
+        Args:
+            websocket: The WebSocket connection
+            canvas_slug: The canvas the connection belongs to
+            queue: The client's frame queue
+        """
+        get = queue.get
+        send = websocket.send_bytes
+        while True:
+            frame, interval = await get()
+            try:
+                await send(frame)
+            except Exception as e:
+                logger.error("Failed to send image to client on canvas '%s': %s", canvas_slug, e)
+                await self.disconnect(websocket, canvas_slug)
+                return
+            if interval:
+                await asyncio.sleep(interval)
+
+    async def _subscribe(self):
+        """Subscribe to the relay channels of all canvases."""
+        pubsub = self._redis.pubsub()
+        await pubsub.subscribe(*(REDIS_CHANNEL_PREFIX + slug for slug in CANVAS_SLUGS))
+        return pubsub
+
+    async def _relay(self, pubsub):
+        """Fan out frames published by any worker to this worker's clients.
+        
+        A message that cannot be relayed is logged and skipped; if the
+        subscription itself fails, it is reopened after RELAY_RETRY_DELAY.
+        """
+        while True:
+            try:
+                async for message in pubsub.listen():
+                    if message["type"] != "message":
+                        continue
+                    try:
+                        canvas_slug = message["channel"].decode()[len(REDIS_CHANNEL_PREFIX):]
+                        interval, = RELAY_HEADER.unpack_from(message["data"])
+                        self._fanout(message["data"][RELAY_HEADER.size:], canvas_slug, interval)
+                    except Exception as e:
+                        logger.error("Dropping relayed message on %s: %s", message["channel"], e)
+            except asyncio.CancelledError:
+                await pubsub.aclose()
+                raise
+            except Exception as e:
+                logger.error("Redis relay failed: %s; resubscribing in %.1fs", e, RELAY_RETRY_DELAY)
+            
+            try:
+                await pubsub.aclose()
+            except Exception:
+                pass
+            # Keep retrying until Redis is back
+            while True:
+                await asyncio.sleep(RELAY_RETRY_DELAY)
+                try:
+                    pubsub = await self._subscribe()
+                    break
+                except Exception as e:
+                    logger.error("Redis resubscribe failed: %s", e)
+            logger.info("Redis relay resubscribed")
+
+    async def broadcast(self, frame: bytes, canvas_slug: str, interval: float = 0.0):
+        """Send a frame to every client of a canvas, across all workers.
+        
+        Args:
+            frame: The prebuilt frame
+            canvas_slug: The canvas to send to
+            interval: Seconds each client's writer waits after sending this frame
+        """
+        if self._redis:
+            await self._redis.publish(
+                REDIS_CHANNEL_PREFIX + canvas_slug, RELAY_HEADER.pack(interval) + frame
             )
+        else:
+            self._fanout(frame, canvas_slug, interval)
+
+    def _fanout(self, frame: bytes, canvas_slug: str, interval: float = 0.0):
+        """Queue a frame for every client of a canvas held by this worker.
+        
+        Clients whose queue is full have the frame dropped rather than
+        buffering without bound.
+        
+        Args:
+            frame: The prebuilt frame
+            canvas_slug: The canvas to send to
+            interval: Seconds each client's writer waits after sending this frame
+        """
+        item = (frame, interval)
+        queued = 0
+        dropped = 0
+        for put in self._puts.get(canvas_slug, ()):
+            try:
+                put(item)
+                queued += 1
+            except asyncio.QueueFull:
+                dropped += 1
+        
+        logger.info(
+            "Image queued for %d clients on canvas '%s', dropped for %d slow clients",
+            queued, canvas_slug, dropped
+        )
+
+    def is_watched(self, canvas_slug: str) -> bool:
+        """Whether a frame sent to a canvas may reach any client.
+        
+        When relaying through Redis, clients may be connected to other
+        workers, so this is always True.
+        
+        Args:
+            canvas_slug: The canvas to check
+            
+        Returns:
+            bool: False only if it is known that nobody is watching
+        """
+        return self._redis is not None or bool(self.get_connections(canvas_slug))
 
-    def get_connections(self, canvas_slug: str) -> Set[WebSocket]:
+    def get_connections(self, canvas_slug: str) -> Tuple[WebSocket, ...]:
         """Get all connections for a specific canvas.
         
         Args:
             canvas_slug: The canvas to get connections for
             
         Returns:
-            Set[WebSocket]: Set of active connections
+            Tuple[WebSocket, ...]: Snapshot of active connections
         """
-        return self.connections.get(canvas_slug, set()) 
\ No newline at end of file
+        return self.connections.get(canvas_slug, ()) 
\ No newline at end of file
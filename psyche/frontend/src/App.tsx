@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import './App.css';
 
 interface CanvasProps {
@@ -9,10 +9,14 @@ function Canvas({ slug }: CanvasProps) {
   const [imageData, setImageData] = useState<string | null>(null);
   const [timestamp, setTimestamp] = useState<string | null>(null);
   const [socket, setSocket] = useState<WebSocket | null>(null);
+  // Object URL of the image on display, revoked when it is replaced
+  const imageUrlRef = useRef<string | null>(null);
 
   // Initialize WebSocket connection
   useEffect(() => {
     const ws = new WebSocket(`ws://localhost:8000/ws/${slug}`);
+    ws.binaryType = 'arraybuffer';
+    const decoder = new TextDecoder();
     
     ws.onopen = () => {
       console.log(`Connected to canvas '${slug}'`);
@@ -25,11 +29,20 @@ function Canvas({ slug }: CanvasProps) {
     };
     
     ws.onmessage = (event) => {
-      const data = JSON.parse(event.data);
-      setImageData(`data:image/jpeg;base64,${data.image}`);
+      // Binary frame: 4-byte header length, JSON header, raw JPEG bytes
+      const buffer: ArrayBuffer = event.data;
+      const headerLength = new DataView(buffer).getUint32(0);
+      const data = JSON.parse(decoder.decode(new Uint8Array(buffer, 4, headerLength)));
+      const blob = new Blob([buffer.slice(4 + headerLength)], { type: 'image/jpeg' });
+      const url = URL.createObjectURL(blob);
+      if (imageUrlRef.current) {
+        URL.revokeObjectURL(imageUrlRef.current);
+      }
+      imageUrlRef.current = url;
+      setImageData(url);
       
       // Format timestamp for display
-      const date = new Date(data.timestamp);
+      const date = new Date(data.timestamp / 1e6);  // ns -> ms
       setTimestamp(date.toLocaleTimeString() + '.' + 
                   date.getMilliseconds().toString().padStart(3, '0'));
     };
@@ -49,6 +62,11 @@ function Canvas({ slug }: CanvasProps) {
       if (ws) {
         ws.close();
       }
+      if (imageUrlRef.current) {
+        URL.revokeObjectURL(imageUrlRef.current);
+        imageUrlRef.current = null;
+        setImageData(null);
+      }
     };
   }, [slug]);
 